@@ -1,73 +1,430 @@
 import streamlit as st
 import subprocess
-import tempfile, zipfile, os, json
+import tempfile, zipfile, os, json, copy, shutil, zlib, re
+import concurrent.futures
 from pathlib import Path
 import sys
 sys.path.append(str(Path(__file__).parent.parent))
 from gemini_generator import GeminiTestCaseGenerator
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import xxhash
+except ImportError:
+    xxhash = None
+
 st.set_page_config(page_title="Creator Portal", layout="wide")
 
+
+# Skeleton for tasks added through the manual form; key order matches the exported JSON
+_NEW_TASK_TEMPLATE = {
+    "id": None,
+    "name": "",
+    "description": "",
+    "required_files": [],
+    "validation_rules": {
+        "type": "html",
+        "file": "",
+        "points": 1,
+        "generatedTests": [],
+        "analysis": {"elements": [], "selectors": []}
+    },
+    "playwright_test": {
+        "route": "",
+        "actions": [],
+        "validate": [],
+        "points": 1
+    },
+    "unlock_condition": {"min_score": 0, "required_tasks": []}
+}
+
+
+# Files offered in the generated-task editor's Required Files picker
+_BASE_AVAILABLE_FILES = (
+    "app.py", "requirements.txt", "templates/base.html",
+    "templates/index.html", "templates/about.html",
+    "templates/contact.html", "static/style.css", "static/script.js",
+    "main.py", "run.py", "config.py", "models.py", "views.py",
+    "templates/login.html", "templates/register.html", "templates/dashboard.html",
+    "static/css/style.css", "static/js/script.js", "static/images/logo.png"
+)
+_BASE_AVAILABLE_SET = frozenset(_BASE_AVAILABLE_FILES)
+
+# Files offered in the manual task builder's Required Files picker
+_REQUIRED_FILES_OPTIONS = (
+    "app.py", "requirements.txt", "templates/base.html",
+    "templates/index.html", "templates/about.html",
+    "templates/contact.html", "templates/login.html",
+    "templates/register.html", "templates/dashboard.html",
+    "static/style.css", "static/script.js", "main.py",
+    "run.py", "config.py", "models.py", "views.py"
+)
+
+
+def _apply_changes(target, changes):
+    # Writes back only the (key, new, current) widget values that actually changed
+    target.update({key: new for key, new, current in changes if new != current})
+
+
+# "Click: type=value" or "Fill type=value: v1, v2"
+_ACTION_RE = re.compile(
+    r"^(?:Click:(?P<click_type>.*?)=(?P<click_value>.*)"
+    r"|Fill(?P<fill_type>[^:=]*)=(?P<fill_value>[^:]*):(?P<variants>.*))$"
+)
+_VALIDATE_RE = re.compile(r"^([^:]*):(.*)$")
+
+
+def _parse_actions(text):
+    parsed = []
+    for line in text.strip().split("\n"):
+        line = line.strip()
+        m = _ACTION_RE.match(line)
+        if m and m["click_type"] is not None:
+            parsed.append({
+                "selector_type": m["click_type"].strip(),
+                "selector_value": m["click_value"].strip(),
+                "click": True
+            })
+        elif m:
+            parsed.append({
+                "selector_type": m["fill_type"].strip(),
+                "selector_value": m["fill_value"].strip(),
+                "input_variants": [v.strip() for v in m["variants"].split(",")]
+            })
+        elif not (line.startswith("Click:") or (line.startswith("Fill") and ":" in line)):
+            # Keep as string for manual actions; malformed Click/Fill lines are dropped
+            parsed.append(line)
+    return parsed
+
+
+def _parse_validation(text):
+    parsed = []
+    for line in text.strip().split("\n"):
+        line = line.strip()
+        m = _VALIDATE_RE.match(line)
+        if m:
+            parsed.append({"type": m[1].strip(), "value": m[2].strip()})
+        else:
+            # Keep as string for manual rules
+            parsed.append(line)
+    return parsed
+
+
+def _export_task(task):
+    # Drops the underscore-prefixed display fields that only live in session state
+    return {k: v for k, v in task.items() if not k.startswith("_")}
+
+
+# Widget keys of the Add Task form, cleared only once a task has been added
+_ADD_TASK_KEYS = (
+    "add_task_name", "add_task_description", "add_task_required_files", "add_task_file_type",
+    "add_task_points", "add_task_route", "add_task_ui_points", "add_task_action_type",
+    "add_task_selector_type", "add_task_selector_value", "add_task_input_variants",
+    "add_task_validation_texts"
+)
+
+
+def _add_manual_task():
+    # Add Task submit callback; reads the form's keyed widgets from session state
+    state = st.session_state
+    task_name = state.add_task_name
+    required_files = state.add_task_required_files
+    if not (task_name and required_files):
+        state.add_task_notice = ("error", "Please provide task name and at least one required file.")
+        return
+    task_description = state.add_task_description
+    file_type, points = state.add_task_file_type, state.add_task_points
+    route, ui_points = state.add_task_route, state.add_task_ui_points
+    action_type, selector_type = state.add_task_action_type, state.add_task_selector_type
+    selector_value, input_variants = state.add_task_selector_value, state.add_task_input_variants
+    validation_texts = state.add_task_validation_texts
+
+    # Create playwright actions
+    actions = []
+    if action_type == "input" and selector_value and input_variants:
+        actions.append({
+            "selector_type": selector_type,
+            "selector_value": selector_value,
+            "input_variants": [v for v in map(str.strip, input_variants.splitlines()) if v]
+        })
+    elif action_type == "click" and selector_value:
+        actions.append({
+            "selector_type": selector_type,
+            "selector_value": selector_value,
+            "click": True
+        })
+
+    # Create validation rules from the non-blank validation texts
+    validate = [
+        {"type": "text_present", "value": text}
+        for text in map(str.strip, validation_texts.splitlines()) if text
+    ]
+
+    # Create task
+    task_id = max(state.tasks, default=0) + 1
+    new_task = copy.deepcopy(_NEW_TASK_TEMPLATE)
+    new_task.update(
+        id=task_id,
+        name=task_name,
+        description=task_description,
+        required_files=required_files
+    )
+    new_task["validation_rules"].update(
+        type=file_type,
+        file=required_files[0] if (file_type != "structure" and required_files) else "",
+        points=points
+    )
+    new_task["playwright_test"].update(
+        route=route,
+        actions=actions,
+        validate=validate,
+        points=ui_points
+    )
+    # Display-only summaries, computed once here instead of on every rerun
+    new_task["_files_summary"] = ", ".join(required_files)
+    new_task["_points_summary"] = f"{points} (validation) + {ui_points} (UI test)"
+
+    state.tasks[task_id] = new_task
+    state.add_task_notice = ("success", f"Task '{task_name}' added!")
+    # A rejected submit keeps what was typed; a successful one starts the next task from scratch
+    for key in _ADD_TASK_KEYS:
+        del state[key]
+
+
+def _remove_manual_task():
+    # Remove button callback; deletes the task picked in the Remove Task selectbox
+    st.session_state.tasks.pop(st.session_state.remove_task_id, None)
+
+
+def _dumps(obj):
+    # Indented JSON as bytes; orjson when installed, stdlib json otherwise
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2)
+    return json.dumps(obj, indent=2).encode("utf-8")
+
+
+def _iter_project_json(project_name, project_description, tasks):
+    # Yields the indented project JSON piece by piece so the encoder only ever sees one task
+    yield b'{\n  "project": ' + _dumps(project_name)
+    yield b',\n  "description": ' + _dumps(project_description)
+    if not tasks:
+        yield b',\n  "tasks": []\n}'
+        return
+    yield b',\n  "tasks": [\n'
+    for i, task in enumerate(tasks):
+        if i:
+            yield b",\n"
+        yield b"    " + _dumps(task).replace(b"\n", b"\n    ")
+    yield b"\n  ]\n}"
+
+
+def _loads(data):
+    # Parses JSON text or bytes; orjson when installed, stdlib json otherwise
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def _tasks_hash(tasks):
+    # Cache key for a task list: one C-level hash over a sorted-key JSON snapshot
+    if orjson is not None:
+        snapshot = orjson.dumps(tasks, option=orjson.OPT_SORT_KEYS)
+    else:
+        snapshot = json.dumps(tasks, sort_keys=True).encode("utf-8")
+    if xxhash is not None:
+        return xxhash.xxh3_64(snapshot).intdigest()
+    return snapshot
+
+
+# Characters ZipFile.extract replaces with "_" in member names on Windows
+_WINDOWS_ILLEGAL_NAME_CHARS = str.maketrans(':<>|"?*', "_" * 7)
+
+
+def _extract_zip(z, dest):
+    # Member names are cleaned the way ZipFile.extract does: drive letters, empty, "." and ".."
+    # parts are dropped, and on Windows illegal characters and trailing dots are replaced/stripped
+    # Directories are created up front so the parallel pass never races on makedirs
+    jobs = {}
+    for info in z.infolist():
+        arcname = info.filename.replace("/", os.path.sep)
+        if os.path.altsep:
+            arcname = arcname.replace(os.path.altsep, os.path.sep)
+        parts = [p for p in os.path.splitdrive(arcname)[1].split(os.path.sep) if p not in ("", os.curdir, os.pardir)]
+        if os.path.sep == "\\":
+            parts = [p.translate(_WINDOWS_ILLEGAL_NAME_CHARS).rstrip(".") for p in parts]
+            parts = [p for p in parts if p]
+        if not parts:
+            continue
+        target = os.path.join(dest, *parts)
+        if info.is_dir():
+            os.makedirs(target, exist_ok=True)
+        else:
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            # Members that map to the same file keep only the last one, as a sequential
+            # extractall would, so no two threads ever write the same path
+            jobs[target] = info
+
+    def extract_member(job):
+        target, info = job
+        with z.open(info) as src, open(target, "wb") as dst:
+            shutil.copyfileobj(src, dst, 1 << 20)
+
+    # Members decompress concurrently; zlib releases the GIL while inflating
+    with concurrent.futures.ThreadPoolExecutor(max_workers=os.cpu_count()) as pool:
+        list(pool.map(extract_member, jobs.items()))
+
+
+def _scan_file_tree(path, root_path):
+    # Nested (name, path, rel_path, children) tuples; children is None for files
+    nodes = []
+    try:
+        # scandir entries carry their type, so no extra stat() per item
+        with os.scandir(path) as it:
+            entries = sorted(it, key=lambda entry: entry.name)
+    except OSError as e:
+        st.error(f"Error accessing directory {path}: {e}")
+        return nodes
+    for entry in entries:
+        rel_path = entry.path[len(root_path) + 1:]
+        if entry.is_dir(follow_symlinks=False):
+            nodes.append((entry.name, entry.path, rel_path, _scan_file_tree(entry.path, root_path)))
+        elif entry.is_file(follow_symlinks=False):
+            nodes.append((entry.name, entry.path, rel_path, None))
+    return nodes
+
+
+def _scandir_recursive(path):
+    # Yields DirEntry objects for every regular file below path
+    with os.scandir(path) as it:
+        for entry in it:
+            if entry.is_dir(follow_symlinks=False):
+                yield from _scandir_recursive(entry.path)
+            elif entry.is_file(follow_symlinks=False):
+                yield entry
+
+
+def _package_manifest(package_dir):
+    # rel_path -> (size, crc32) for every file in the package; content-based because
+    # each save rewrites the files, so mtimes always change
+    manifest = {}
+    root = str(package_dir)
+    for entry in _scandir_recursive(root):
+        crc = 0
+        with open(entry.path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                crc = zlib.crc32(chunk, crc)
+        manifest[entry.path[len(root) + 1:]] = (entry.stat().st_size, crc)
+    return manifest
+
+
+# Extensions dropped from a task's file name when suggesting its UI test route
+_ROUTE_EXTS = frozenset({".html", ".css", ".js"})
+
+
+# Package members worth deflating; everything else (zips, images) is stored as-is
+_DEFLATE_SUFFIXES = frozenset({".json", ".txt", ".md", ".py", ".html", ".css", ".js"})
+
+
+_PREVIEW_LIMIT = 1_000_000
+
+
+# (file preview text, whether it was cut at _PREVIEW_LIMIT characters); mtime_ns is part of the
+# cache key so edits on disk invalidate it
+@st.cache_data(max_entries=64, show_spinner=False)
+def _read_preview(path, mtime_ns):
+    with open(path, "r", encoding="utf-8", errors="replace") as f:
+        content = f.read(_PREVIEW_LIMIT + 1)
+    return content[:_PREVIEW_LIMIT], len(content) > _PREVIEW_LIMIT
+
+
+@st.cache_resource
+def _gemini_executor():
+    # Worker pool for Gemini generation only, shared across reruns so the page stays interactive
+    return concurrent.futures.ThreadPoolExecutor(max_workers=2)
+
+
+@st.cache_resource
+def _gemini_generator():
+    # Loads .env and configures the Gemini client once per process, not on every rerun
+    return GeminiTestCaseGenerator()
+
+
+# Serialized project config, cached so reruns with unchanged tasks skip the encoder
+@st.cache_data(max_entries=8, show_spinner=False, hash_funcs={list: _tasks_hash})
+def _serialize_project(project_name, project_description, tasks):
+    return b"".join(_iter_project_json(project_name, project_description, tasks))
+
+
 st.markdown("""<style>
 .section { background: #fff; border:1px solid #ddd; border-radius:10px; padding:20px; margin-bottom:20px; }
 </style>""", unsafe_allow_html=True)
 
 st.title("Creator Portal")
 
+# Session defaults
+st.session_state.setdefault("selected_file", None)
+st.session_state.setdefault("generated_json", None)
+st.session_state.setdefault("edit_mode", False)
+st.session_state.setdefault("tasks", {})  # manual tasks keyed by task id
+
 # Upload project ZIP
 uploaded_zip = st.file_uploader("Upload Base Project ZIP", type=["zip"])
 
 if uploaded_zip:
-    tmp_dir = tempfile.mkdtemp()
-    zip_path = os.path.join(tmp_dir, uploaded_zip.name)
-    with open(zip_path, "wb") as f:
-        f.write(uploaded_zip.getvalue())
-    try:
-        with zipfile.ZipFile(zip_path, "r") as z:
-            z.extractall(tmp_dir)
-        st.success("Uploaded and extracted project.")
-    except (zipfile.BadZipFile, EOFError) as e:
-        st.error("The uploaded ZIP appears to be corrupted or incomplete. Please re-upload a valid ZIP file.")
-        st.stop()
+    # Extract and walk the project once per uploaded file, not on every rerun
+    upload_key = (uploaded_zip.file_id, uploaded_zip.name)
+    if st.session_state.get("tree_zip_key") != upload_key:
+        tmp_dir = tempfile.mkdtemp()
+        try:
+            # UploadedFile is already an in-memory buffer, so extract from it directly
+            uploaded_zip.seek(0)
+            with zipfile.ZipFile(uploaded_zip, "r") as z:
+                _extract_zip(z, tmp_dir)
+        except (zipfile.BadZipFile, EOFError) as e:
+            st.error("The uploaded ZIP appears to be corrupted or incomplete. Please re-upload a valid ZIP file.")
+            st.stop()
+        st.session_state.tmp_dir = tmp_dir
+        st.session_state.file_tree = _scan_file_tree(tmp_dir, tmp_dir)
+        st.session_state.tree_zip_key = upload_key
+    tmp_dir = st.session_state.tmp_dir
+    st.success("Uploaded and extracted project.")
 
     col_left, col_right = st.columns([0.5, 0.5])
 
     # ---------------------- LEFT PANEL ----------------------
     with col_left:
         st.subheader("Project File Structure")
-        root_path = tmp_dir
 
-        def show_file_tree(path, level=0):
+        def show_file_tree(nodes, level=0):
+            # Renders purely from the cached tree; no filesystem calls here
             indent = "  " * level
-            try:
-                items = sorted(os.listdir(path))
-                for item in items:
-                    item_path = os.path.join(path, item)
-                    rel_path = os.path.relpath(item_path, root_path)
-
-                    if os.path.isdir(item_path):
-                        with st.expander(f"{indent} {item}", expanded=False):
-                            show_file_tree(item_path, level + 1)
-                    else:
-                        file_ext = os.path.splitext(item)[1].lower()
-                        icon = "HTML" if file_ext == '.html' else "Python" if file_ext == '.py' else "Text"
-                        if st.button(f"{indent}{icon} {item}", key=f"file_{rel_path}"):
-                            st.session_state.selected_file = item_path
-                            st.session_state.selected_file_name = item
-            except Exception as e:
-                st.error(f"Error accessing directory {path}: {e}")
+            for name, path, rel_path, children in nodes:
+                if children is not None:
+                    with st.expander(f"{indent} {name}", expanded=False):
+                        show_file_tree(children, level + 1)
+                else:
+                    file_ext = os.path.splitext(name)[1].lower()
+                    icon = "HTML" if file_ext == '.html' else "Python" if file_ext == '.py' else "Text"
+                    if st.button(f"{indent}{icon} {name}", key=f"file_{rel_path}"):
+                        st.session_state.selected_file = path
+                        st.session_state.selected_file_name = name
 
-        show_file_tree(root_path)
+        show_file_tree(st.session_state.file_tree)
 
         # Optional: File preview
-        if hasattr(st.session_state, 'selected_file') and st.session_state.selected_file:
+        if st.session_state.selected_file:
             selected_file = st.session_state.selected_file
             st.markdown(f"**Selected:** {st.session_state.selected_file_name}")
             try:
                 file_ext = os.path.splitext(selected_file)[1].lower()
-                with open(selected_file, 'r', encoding='utf-8') as f:
-                    content = f.read()
+                content, truncated = _read_preview(selected_file, os.stat(selected_file).st_mtime_ns)
                 st.code(content, language=file_ext[1:] if file_ext else 'text')
+                if truncated:
+                    st.caption(f"Preview truncated to the first {_PREVIEW_LIMIT:,} characters.")
             except Exception as e:
                 st.error(f"Error reading file: {e}")
 
@@ -75,7 +432,7 @@ if uploaded_zip:
         st.subheader("Auto-generate Testcases")
 
         # Initialize Gemini generator
-        gemini_generator = GeminiTestCaseGenerator()
+        gemini_generator = _gemini_generator()
         generation_method = gemini_generator.get_generation_method()
 
         if st.button("Generate Testcases", use_container_width=True):
@@ -87,16 +444,10 @@ if uploaded_zip:
                         "project": "New Project",
                         "description": "Auto-generated progressive validation project"
                     }
-                    result_json = gemini_generator.generate_project_json_with_ai(tmp_dir, project_meta)
-                    
-                    # Save the generated JSON
-                    project_file = os.path.join(tmp_dir, "project_tasks.json")
-                    with open(project_file, "w") as f:
-                        json.dump(result_json, f, indent=2)
-                    
-                    st.success("Testcases generated")
-                    st.json(result_json)
-                    st.session_state.generated_json = result_json
+                    # The Gemini call is network-bound; run it off the script thread and poll below
+                    st.session_state.ai_future = _gemini_executor().submit(
+                        gemini_generator.generate_project_json_with_ai, tmp_dir, project_meta
+                    )
                     
                 else:
                     # Fallback to original parser method
@@ -104,6 +455,7 @@ if uploaded_zip:
                     node_script = Path(__file__).parent / "autoTestcaseGenerator.js"
                     result = subprocess.run(
                         ["node", str(node_script), tmp_dir],
+                        stdin=subprocess.DEVNULL,
                         capture_output=True,
                         text=True
                     )
@@ -112,8 +464,8 @@ if uploaded_zip:
                         st.text_area("Generator Output Log", result.stdout, height=150)
                         project_json_path = os.path.join(tmp_dir, "project_tasks.json")
                         if os.path.exists(project_json_path):
-                            with open(project_json_path, "r", encoding="utf-8") as f:
-                                project_data = json.load(f)
+                            with open(project_json_path, "rb") as f:
+                                project_data = _loads(f.read())
                             st.json(project_data)
                             st.session_state.generated_json = project_data
                             # Store generation timestamp
@@ -129,12 +481,51 @@ if uploaded_zip:
                 if generation_method == 'AI':
                     st.info("💡 Tip: Check your GEMINI_API_KEY in .env or try switching to PARSER mode")
 
+        # Pending Gemini generation is polled by a fragment every half second, so the rest of the
+        # page keeps rendering and keeps its widget state while the worker runs
+        # (st.fragment(run_every=...) needs Streamlit >= 1.37)
+        @st.fragment(run_every=0.5)
+        def _ai_generation_poll():
+            ai_future = st.session_state.get("ai_future")
+            if ai_future is None:
+                return
+            if not ai_future.done():
+                st.info("Generating testcases with Gemini...")
+                return
+            del st.session_state.ai_future
+            try:
+                result_json = ai_future.result()
+                
+                # Save the generated JSON
+                project_file = os.path.join(tmp_dir, "project_tasks.json")
+                with open(project_file, "wb") as f:
+                    f.write(_dumps(result_json))
+                
+                st.session_state.generated_json = result_json
+                st.session_state.ai_outcome = ("success", result_json)
+            except Exception as e:
+                st.session_state.ai_outcome = ("error", str(e))
+            # Full rerun so the Task Configuration panel picks up the generated project
+            st.rerun()
+
+        # Only registered while a generation is pending, so idle pages don't poll
+        if "ai_future" in st.session_state:
+            _ai_generation_poll()
+
+        ai_outcome = st.session_state.pop("ai_outcome", None)
+        if ai_outcome and ai_outcome[0] == "success":
+            st.success("Testcases generated")
+            st.json(ai_outcome[1])
+        elif ai_outcome:
+            st.error(f"Generation failed: {ai_outcome[1]}")
+            st.info("💡 Tip: Check your GEMINI_API_KEY in .env or try switching to PARSER mode")
+
     # ---------------------- RIGHT PANEL ----------------------
     with col_right:
         st.subheader("Task Configuration")
         
         # Check if we have generated JSON
-        if hasattr(st.session_state, 'generated_json') and st.session_state.generated_json:
+        if st.session_state.generated_json:
             project_data = st.session_state.generated_json
             
             # Project Info Section
@@ -145,9 +536,19 @@ if uploaded_zip:
             st.markdown("---")
             st.markdown("### Tasks Configuration")
             
-            # Tasks Editor
-            for i, task in enumerate(project_data["tasks"]):
-                with st.expander(f"Task {task['id']}: {task['name']}", expanded=False):
+            # Task ids gathered once for the unlock hints and the next new id
+            all_ids = [t["id"] for t in project_data["tasks"]]
+            id_strs = list(map(str, all_ids))
+            max_id = max(all_ids, default=0)
+            
+            # Each task's editor runs as a fragment, so opening, closing or editing one task only
+            # reruns that task; edits land in place on the task dicts held in st.session_state.generated_json
+            @st.fragment
+            def _task_editor_fragment(i, task, id_strs):
+                # Collapsed tasks skip building their editor widgets entirely
+                if not st.toggle(f"Task {task['id']}: {task['name']}", key=f"task_open_{i}"):
+                    return
+                with st.container(border=True):
                     # Basic task info
                     new_name = st.text_input(f"Task Name", value=task["name"], key=f"task_name_{i}")
                     new_description = st.text_area(f"Description", value=task["description"], key=f"task_desc_{i}")
@@ -155,37 +556,24 @@ if uploaded_zip:
                     # Required files - use multi-select
                     st.markdown("**Required Files:**")
                     
-                    # Get available files from the project (if available)
-                    available_files = [
-                        "app.py", "requirements.txt", "templates/base.html", 
-                        "templates/index.html", "templates/about.html", 
-                        "templates/contact.html", "static/style.css", "static/script.js",
-                        "main.py", "run.py", "config.py", "models.py", "views.py",
-                        "templates/login.html", "templates/register.html", "templates/dashboard.html",
-                        "static/css/style.css", "static/js/script.js", "static/images/logo.png"
-                    ]
-                    
-                    # Add any files from the current task that aren't in the list
+                    # Add any files from the current task that aren't in the base list
                     current_files = task.get("required_files", [])
-                    for file in current_files:
-                        if file not in available_files:
-                            available_files.append(file)
+                    extras = [f for f in dict.fromkeys(current_files) if f not in _BASE_AVAILABLE_SET]
                     
                     selected_files = st.multiselect(
                         "Select Required Files",
-                        options=available_files,
+                        options=(*_BASE_AVAILABLE_FILES, *extras),
                         default=current_files,
                         key=f"required_files_{i}",
                         help="Select the files that students must include in their project"
                     )
                     
                     # Update task data only if changed
-                    if new_name != task["name"]:
-                        task["name"] = new_name
-                    if new_description != task["description"]:
-                        task["description"] = new_description
-                    if selected_files != current_files:
-                        task["required_files"] = selected_files
+                    _apply_changes(task, (
+                        ("name", new_name, task["name"]),
+                        ("description", new_description, task["description"]),
+                        ("required_files", selected_files, current_files),
+                    ))
                     
                     # Validation Rules - populate from analysis
                     st.markdown("**Validation Rules:**")
@@ -219,9 +607,9 @@ if uploaded_zip:
                         )
                         
                         # Dynamic points based on complexity
-                        elements_count = len(analysis.get("elements", []))
-                        forms_count = len(analysis.get("forms", []))
-                        complexity_score = min(50, elements_count * 2 + forms_count * 5)
+                        complexity_score = min(
+                            50, len(analysis.get("elements") or ()) * 2 + len(analysis.get("forms") or ()) * 5
+                        )
                         new_points = st.number_input(
                             "Points", 
                             min_value=1, 
@@ -239,12 +627,11 @@ if uploaded_zip:
                         )
                     
                     # Update validation rules only if changed
-                    if new_type != current_type:
-                        validation_rules["type"] = new_type
-                    if new_points != current_points:
-                        validation_rules["points"] = new_points
-                    if new_file != current_file:
-                        validation_rules["file"] = new_file
+                    _apply_changes(validation_rules, (
+                        ("type", new_type, current_type),
+                        ("points", new_points, current_points),
+                        ("file", new_file, current_file),
+                    ))
                     
                     # Initialize analysis variables
                     elements = []
@@ -254,9 +641,9 @@ if uploaded_zip:
                     # Show analysis results
                     if analysis:
                         st.markdown("**Analysis Results:**")
-                        elements = analysis.get("elements", [])
-                        forms = analysis.get("forms", [])
-                        links = analysis.get("links", [])
+                        elements = analysis.get("elements") or ()
+                        forms = analysis.get("forms") or ()
+                        links = analysis.get("links") or ()
                         
                         col_analysis1, col_analysis2, col_analysis3 = st.columns(3)
                         with col_analysis1:
@@ -269,8 +656,10 @@ if uploaded_zip:
                         # Show detected elements for reference
                         if elements:
                             with st.expander("Detected Elements", expanded=False):
-                                for elem in elements[:10]:  # Show first 10
-                                    st.write(f"• {elem.get('tag', 'unknown')} - {elem.get('class', 'no class')}")
+                                st.markdown("\n".join(
+                                    f"- {elem.get('tag', 'unknown')} - {elem.get('class', 'no class')}"
+                                    for elem in elements[:10]  # Show first 10
+                                ))
                     
                     task["validation_rules"] = validation_rules
                     
@@ -290,7 +679,8 @@ if uploaded_zip:
                         
                         # Generate route from file name
                         file_name = validation_rules.get("file", "")
-                        route_suggestion = f"/{file_name.replace('.html', '').replace('.css', '').replace('.js', '')}" if file_name else ""
+                        stem, ext = os.path.splitext(file_name)
+                        route_suggestion = f"/{stem if ext in _ROUTE_EXTS else file_name}" if file_name else ""
                         
                         new_route = st.text_input(
                             "Route", 
@@ -306,10 +696,10 @@ if uploaded_zip:
                         )
                         
                         # Update only if changed
-                        if new_route != current_route:
-                            ui_test["route"] = new_route
-                        if new_ui_points != current_ui_points:
-                            ui_test["points"] = new_ui_points
+                        _apply_changes(ui_test, (
+                            ("route", new_route, current_route),
+                            ("points", new_ui_points, current_ui_points),
+                        ))
                     
                     with col4:
                         # Generate actions from analysis
@@ -354,37 +744,7 @@ if uploaded_zip:
                         
                         # Parse actions back to proper format
                         if actions_input.strip():
-                            parsed_actions = []
-                            for line in actions_input.strip().split("\n"):
-                                line = line.strip()
-                                if line.startswith("Click:"):
-                                    # Parse click action
-                                    parts = line.split("=", 1)
-                                    if len(parts) == 2:
-                                        selector_type = parts[0].replace("Click:", "").strip()
-                                        selector_value = parts[1].strip()
-                                        parsed_actions.append({
-                                            "selector_type": selector_type,
-                                            "selector_value": selector_value,
-                                            "click": True
-                                        })
-                                elif line.startswith("Fill") and ":" in line:
-                                    # Parse fill action
-                                    fill_part, variants_part = line.split(":", 1)
-                                    if "=" in fill_part:
-                                        selector_part = fill_part.replace("Fill", "").strip()
-                                        if "=" in selector_part:
-                                            selector_type, selector_value = selector_part.split("=", 1)
-                                            variants = [v.strip() for v in variants_part.split(",")]
-                                            parsed_actions.append({
-                                                "selector_type": selector_type.strip(),
-                                                "selector_value": selector_value.strip(),
-                                                "input_variants": variants
-                                            })
-                                else:
-                                    # Keep as string for manual actions
-                                    parsed_actions.append(line)
-                            ui_test["actions"] = parsed_actions
+                            ui_test["actions"] = _parse_actions(actions_input)
                         else:
                             ui_test["actions"] = []
                     
@@ -412,19 +772,7 @@ if uploaded_zip:
                     
                     # Parse validation rules back to proper format
                     if validation_input.strip():
-                        parsed_validation = []
-                        for line in validation_input.strip().split("\n"):
-                            line = line.strip()
-                            if ":" in line:
-                                rule_type, rule_value = line.split(":", 1)
-                                parsed_validation.append({
-                                    "type": rule_type.strip(),
-                                    "value": rule_value.strip()
-                                })
-                            else:
-                                # Keep as string for manual rules
-                                parsed_validation.append(line)
-                        ui_test["validate"] = parsed_validation
+                        ui_test["validate"] = _parse_validation(validation_input)
                     else:
                         ui_test["validate"] = []
                     
@@ -451,7 +799,7 @@ if uploaded_zip:
                     
                     with col6:
                         # Show available task IDs for reference
-                        available_task_ids = [str(t["id"]) for t in project_data["tasks"] if t["id"] != task["id"]]
+                        available_task_ids = id_strs[:i] + id_strs[i + 1:]
                         current_required_tasks = unlock_condition.get("required_tasks", [])
                         required_tasks_text = ", ".join(map(str, current_required_tasks))
                         st.caption(f"Available task IDs: {', '.join(available_task_ids)}")
@@ -468,21 +816,25 @@ if uploaded_zip:
                             new_required_tasks = current_required_tasks
                     
                     # Update only if changed
-                    if new_min_score != current_min_score:
-                        unlock_condition["min_score"] = new_min_score
-                    if new_required_tasks != current_required_tasks:
-                        unlock_condition["required_tasks"] = new_required_tasks
+                    _apply_changes(unlock_condition, (
+                        ("min_score", new_min_score, current_min_score),
+                        ("required_tasks", new_required_tasks, current_required_tasks),
+                    ))
                     
                     task["unlock_condition"] = unlock_condition
                     
                     st.divider()
             
+            # Tasks Editor
+            for i, task in enumerate(project_data["tasks"]):
+                _task_editor_fragment(i, task, id_strs)
+            
             # Add new task button
             st.markdown("### Add New Task")
             col_add, col_spacer = st.columns([0.3, 0.7])
             with col_add:
                 if st.button("Add New Task", use_container_width=True):
-                    new_task_id = max([t["id"] for t in project_data["tasks"]], default=0) + 1
+                    new_task_id = max_id + 1
                     new_task = {
                         "id": new_task_id,
                         "name": f"New Task {new_task_id}",
@@ -524,26 +876,19 @@ if uploaded_zip:
                     package_dir = projects_dir / f"{project_name}_package"
                     package_dir.mkdir(exist_ok=True)
                     
-                    # Save JSON configuration to projects directory (for student.py to find)
+                    # JSON configuration for the projects directory (for student.py to find)
+                    # and the package directory; serialized once and written to both
                     json_filename = f"{project_name}_configuration.json"
                     json_path = projects_dir / json_filename
-                    with open(json_path, "w", encoding="utf-8") as f:
-                        json.dump(project_data, f, indent=2)
-                    
-                    # Also save in package directory
                     package_json_path = package_dir / "project_configuration.json"
-                    with open(package_json_path, "w", encoding="utf-8") as f:
-                        json.dump(project_data, f, indent=2)
+                    config_bytes = _dumps(project_data)
                     
-                    # Copy ZIP file to package
+                    # Copy of the uploaded ZIP file
                     zip_path = package_dir / uploaded_zip.name
-                    with open(zip_path, "wb") as f:
-                        f.write(uploaded_zip.getvalue())
                     
-                    # Create project info file
+                    # Project info file
                     info_path = package_dir / "README.txt"
-                    with open(info_path, "w", encoding="utf-8") as f:
-                        f.write(f"""Project Package: {project_data.get('project', 'Untitled Project')}
+                    readme = f"""Project Package: {project_data.get('project', 'Untitled Project')}
 Description: {project_data.get('description', 'No description provided')}
 Generated: {st.session_state.get('generation_time', 'Unknown')}
 Tasks: {len(project_data.get('tasks', []))}
@@ -556,7 +901,19 @@ To use this package:
 1. Extract the ZIP file to get the project source code
 2. Use the JSON configuration with your validation system
 3. Run UI tests using the configured routes and actions
-""")
+"""
+                    
+                    # The writes are independent, so run them concurrently and wait for all
+                    # of them before the package ZIP is built
+                    with concurrent.futures.ThreadPoolExecutor(max_workers=4) as pool:
+                        writes = [
+                            pool.submit(json_path.write_bytes, config_bytes),
+                            pool.submit(package_json_path.write_bytes, config_bytes),
+                            pool.submit(zip_path.write_bytes, uploaded_zip.getbuffer()),
+                            pool.submit(info_path.write_text, readme, encoding="utf-8"),
+                        ]
+                    for write in writes:
+                        write.result()
                     
                     st.success(f"Project saved and available to students!")
                     st.info(f"Project '{project_data.get('project', 'Untitled')}' is now available in the Student Portal")
@@ -564,32 +921,37 @@ To use this package:
                     st.caption(f"JSON config: {json_filename}")
                     st.caption(f"Package: {package_dir}")
                     
-                    # Create downloadable ZIP of the entire package
-                    import zipfile
+                    # Create downloadable ZIP of the entire package, skipping the rebuild
+                    # when no file in the package changed since the last save
                     package_zip_path = projects_dir / f"{project_name}_package.zip"
-                    with zipfile.ZipFile(package_zip_path, 'w', zipfile.ZIP_DEFLATED) as package_zip:
-                        for file_path in package_dir.rglob('*'):
-                            if file_path.is_file():
-                                package_zip.write(file_path, file_path.relative_to(package_dir))
+                    manifest = (str(package_zip_path), _package_manifest(package_dir))
+                    if not package_zip_path.exists() or st.session_state.get("package_manifest") != manifest:
+                        with zipfile.ZipFile(package_zip_path, 'w', zipfile.ZIP_STORED) as package_zip:
+                            for rel_path in sorted(manifest[1]):
+                                if os.path.splitext(rel_path)[1].lower() in _DEFLATE_SUFFIXES:
+                                    package_zip.write(package_dir / rel_path, rel_path,
+                                                      compress_type=zipfile.ZIP_DEFLATED, compresslevel=1)
+                                else:
+                                    package_zip.write(package_dir / rel_path, rel_path)
+                        st.session_state.package_manifest = manifest
+                        st.session_state.pop("package_bytes", None)
                     
-                    # Provide download for the complete package
-                    with open(package_zip_path, "rb") as f:
-                        package_content = f.read()
+                    # Provide download for the complete package, reading the archive only once per build
+                    if "package_bytes" not in st.session_state:
+                        st.session_state.package_bytes = package_zip_path.read_bytes()
                     
                     st.download_button(
                         label="Download Complete Package",
-                        data=package_content,
+                        data=st.session_state.package_bytes,
                         file_name=f"{project_name}_package.zip",
                         mime="application/zip",
                         help="Downloads the complete project package with JSON config and source ZIP"
                     )
                     
-                    # Also provide individual JSON download
-                    with open(json_path, "r", encoding="utf-8") as f:
-                        json_content = f.read()
+                    # Also provide individual JSON download, from the bytes just written
                     st.download_button(
                         label="Download JSON Only",
-                        data=json_content,
+                        data=config_bytes,
                         file_name=json_filename,
                         mime="application/json",
                         help="Downloads only the JSON configuration file"
@@ -597,25 +959,25 @@ To use this package:
             
             with col_edit:
                 if st.button("Edit Raw JSON", use_container_width=True):
-                    st.session_state.edit_mode = not st.session_state.get('edit_mode', False)
+                    st.session_state.edit_mode = not st.session_state.edit_mode
             
             # Raw JSON editor
-            if st.session_state.get('edit_mode', False):
+            if st.session_state.edit_mode:
                 st.markdown("### Raw JSON Editor")
                 json_text = st.text_area(
                     "Edit JSON Configuration",
-                    value=json.dumps(project_data, indent=2),
+                    value=_dumps(project_data).decode("utf-8"),
                     height=400,
                     key="raw_json_editor"
                 )
                 
                 if st.button("Update from JSON"):
                     try:
-                        updated_data = json.loads(json_text)
+                        updated_data = _loads(json_text)
                         st.session_state.generated_json = updated_data
                         st.success("JSON updated successfully!")
                         st.rerun()
-                    except json.JSONDecodeError as e:
+                    except json.JSONDecodeError as e:  # orjson.JSONDecodeError subclasses it
                         st.error(f"Invalid JSON: {e}")
         
         else:
@@ -636,161 +998,117 @@ To use this package:
             st.markdown("---")
             st.markdown("#### Add Tasks")
             
-            # Initialize session state for tasks
-            if 'tasks' not in st.session_state:
-                st.session_state.tasks = []
-            
-            # Task creation form
-            with st.expander("Add New Task", expanded=True):
-                task_name = st.text_input("Task Name", placeholder="e.g., Login Validation")
-                task_description = st.text_area("Task Description", placeholder="e.g., Auto-generated validation for login.html")
-                
-                col3, col4 = st.columns(2)
-                with col3:
-                    required_files = st.multiselect(
-                        "Required Files",
-                        options=[
-                            "app.py", "requirements.txt", "templates/base.html", 
-                            "templates/index.html", "templates/about.html", 
-                            "templates/contact.html", "templates/login.html",
-                            "templates/register.html", "templates/dashboard.html",
-                            "static/style.css", "static/script.js", "main.py", 
-                            "run.py", "config.py", "models.py", "views.py"
-                        ],
-                        default=[]
-                    )
+            # Task builder runs as a fragment so adding/removing tasks only reruns this section
+            # (st.fragment needs Streamlit >= 1.37). Add and Remove work in on_click callbacks rather
+            # than calling st.rerun(scope="fragment"), which raises if the click lands in a full-app rerun
+            @st.fragment
+            def _task_builder_fragment(project_name, project_description):
+                # Task creation form; inputs are batched so typing doesn't trigger reruns
+                with st.expander("Add New Task", expanded=True), st.form("add_task_form", clear_on_submit=False):
+                    st.text_input("Task Name", placeholder="e.g., Login Validation", key="add_task_name")
+                    st.text_area("Task Description", placeholder="e.g., Auto-generated validation for login.html", key="add_task_description")
                 
-                with col4:
-                    file_type = st.selectbox("File Type", ["structure", "html", "py", "css", "js"])
-                    points = st.number_input("Points", min_value=1, max_value=50, value=1)
+                    col3, col4 = st.columns(2)
+                    with col3:
+                        st.multiselect(
+                            "Required Files",
+                            options=_REQUIRED_FILES_OPTIONS,
+                            default=[],
+                            key="add_task_required_files"
+                        )
                 
-                # UI test configuration
-                st.markdown("**UI Test Configuration:**")
-                col5, col6 = st.columns(2)
-                with col5:
-                    route = st.text_input("Route", placeholder="/login")
-                with col6:
-                    ui_points = st.number_input("UI Test Points", min_value=1, max_value=50, value=1)
+                    with col4:
+                        st.selectbox("File Type", ["structure", "html", "py", "css", "js"], key="add_task_file_type")
+                        st.number_input("Points", min_value=1, max_value=50, value=1, key="add_task_points")
                 
-                # Actions for UI test
-                st.markdown("**Actions:**")
-                action_type = st.selectbox("Action Type", ["click", "input", "navigate"])
+                    # UI test configuration
+                    st.markdown("**UI Test Configuration:**")
+                    col5, col6 = st.columns(2)
+                    with col5:
+                        st.text_input("Route", placeholder="/login", key="add_task_route")
+                    with col6:
+                        st.number_input("UI Test Points", min_value=1, max_value=50, value=1, key="add_task_ui_points")
                 
-                if action_type == "input":
+                    # Actions for UI test (form widgets can't toggle on action type, so all are shown)
+                    st.markdown("**Actions:**")
                     col7, col8 = st.columns(2)
                     with col7:
-                        selector_type = st.selectbox("Selector Type", ["class", "id", "text"])
-                        selector_value = st.text_input("Selector Value", placeholder="form-control")
+                        st.selectbox("Action Type", ["click", "input", "navigate"], key="add_task_action_type")
+                        st.selectbox("Selector Type", ["class", "id", "text"], key="add_task_selector_type")
+                        st.text_input("Selector Value", placeholder="btn-primary", key="add_task_selector_value")
                     with col8:
-                        input_variants = st.text_area("Input Variants (one per line)", 
-                                                   placeholder="test@example.com\ninvalid_email\nuser@domain")
-                elif action_type == "click":
-                    col7, col8 = st.columns(2)
-                    with col7:
-                        selector_type = st.selectbox("Selector Type", ["class", "id", "text"])
-                        selector_value = st.text_input("Selector Value", placeholder="btn-primary")
-                    with col8:
-                        st.write("Click action will be added")
+                        st.text_area("Input Variants (one per line)", 
+                                     placeholder="test@example.com\ninvalid_email\nuser@domain",
+                                     help="Only used for input actions",
+                                     key="add_task_input_variants")
                 
-                # Validation rules
-                st.markdown("**Validation Rules:**")
-                validation_texts = st.text_area("Validation Texts (one per line)", 
-                                               placeholder="Login successful\nInvalid credentials\nEmail is required")
+                    # Validation rules
+                    st.markdown("**Validation Rules:**")
+                    st.text_area("Validation Texts (one per line)", 
+                                 placeholder="Login successful\nInvalid credentials\nEmail is required",
+                                 key="add_task_validation_texts")
                 
-                if st.button("Add Task", type="primary"):
-                    if task_name and required_files:
-                        # Create playwright actions
-                        actions = []
-                        if action_type == "input" and selector_value and input_variants:
-                            actions.append({
-                                "selector_type": selector_type,
-                                "selector_value": selector_value,
-                                "input_variants": [v.strip() for v in input_variants.split('\n') if v.strip()]
-                            })
-                        elif action_type == "click" and selector_value:
-                            actions.append({
-                                "selector_type": selector_type,
-                                "selector_value": selector_value,
-                                "click": True
-                            })
-                        
-                        # Create validation rules
-                        validate = []
-                        
-                        # Add custom validation texts
-                        for text in validation_texts.split('\n'):
-                            if text.strip():
-                                validate.append({"type": "text_present", "value": text.strip()})
-                        
-                        # Create task
-                        task_id = len(st.session_state.tasks) + 1
-                        new_task = {
-                            "id": task_id,
-                            "name": task_name,
-                            "description": task_description,
-                            "required_files": required_files,
-                            "validation_rules": {
-                                "type": file_type,
-                                "file": required_files[0] if (file_type != "structure" and required_files) else "",
-                                "points": points,
-                                "generatedTests": [],
-                                "analysis": {"elements": [], "selectors": []}
-                            },
-                            "playwright_test": {
-                                "route": route,
-                                "actions": actions,
-                                "validate": validate,
-                                "points": ui_points
-                            },
-                            "unlock_condition": {"min_score": 0, "required_tasks": []}
-                        }
-                        
-                        st.session_state.tasks.append(new_task)
-                        st.success(f"Task '{task_name}' added!")
-                        st.rerun()
-                    else:
-                        st.error("Please provide task name and at least one required file.")
+                    # The task is added in the submit callback, before this fragment renders the list below
+                    st.form_submit_button("Add Task", type="primary", on_click=_add_manual_task)
+                    notice = st.session_state.pop("add_task_notice", None)
+                    if notice and notice[0] == "success":
+                        st.success(notice[1])
+                    elif notice:
+                        st.error(notice[1])
             
-            # Display current tasks
-            if st.session_state.tasks:
-                st.markdown("---")
-                st.markdown("#### Current Tasks")
-                for i, task in enumerate(st.session_state.tasks):
-                    with st.expander(f"Task {task['id']}: {task['name']}", expanded=False):
-                        col9, col10 = st.columns([3, 1])
-                        with col9:
-                            st.write(f"**Description:** {task['description']}")
-                            st.write(f"**Required Files:** {', '.join(task['required_files'])}")
-                            st.write(f"**Route:** {task['playwright_test']['route']}")
-                            st.write(f"**Points:** {task['validation_rules']['points']} (validation) + {task['playwright_test']['points']} (UI test)")
-                        with col10:
-                            if st.button("Remove", key=f"remove_{i}"):
-                                st.session_state.tasks.pop(i)
-                                st.rerun()
+                # Display current tasks
+                if st.session_state.tasks:
+                    st.markdown("---")
+                    st.markdown("#### Current Tasks")
+                    tasks = st.session_state.tasks
+                    # One table for all tasks instead of an expander + widgets per task
+                    st.dataframe(
+                        [{
+                            "ID": task["id"],
+                            "Name": task["name"],
+                            "Description": task["description"],
+                            "Required Files": task["_files_summary"],
+                            "Route": task["playwright_test"]["route"],
+                            "Points": task["_points_summary"]
+                        } for task in tasks.values()],
+                        width="stretch",
+                        hide_index=True
+                    )
+                    col9, col10 = st.columns([3, 1])
+                    with col9:
+                        remove_id = st.selectbox(
+                            "Remove Task",
+                            list(tasks),
+                            format_func=lambda task_id: f"Task {task_id}: {tasks[task_id]['name']}",
+                            key="remove_task_id"
+                        )
+                    with col10:
+                        st.button("Remove", key="remove_task", use_container_width=True, on_click=_remove_manual_task)
                 
-                # Generate final JSON
-                st.markdown("---")
-                st.markdown("#### Generate Project Configuration")
+                    # Generate final JSON
+                    st.markdown("---")
+                    st.markdown("#### Generate Project Configuration")
                 
-                if st.button("Generate Project JSON", type="primary"):
-                    project_config = {
-                        "project": project_name,
-                        "description": project_description,
-                        "tasks": st.session_state.tasks
-                    }
+                    if st.button("Generate Project JSON", type="primary"):
+                        json_bytes = _serialize_project(
+                            project_name,
+                            project_description,
+                            [_export_task(task) for task in st.session_state.tasks.values()]
+                        )
                     
-                    # Display the JSON
-                    st.success("Project configuration generated!")
-                    st.json(project_config)
+                        # Display the already-serialized JSON as text rather than an interactive tree
+                        st.success("Project configuration generated!")
+                        st.code(json_bytes.decode("utf-8"), language="json")
                     
-                    # Download button
-                    json_str = json.dumps(project_config, indent=2)
-                    st.download_button(
-                        label="Download Project Configuration",
-                        data=json_str,
-                        file_name="project_configuration.json",
-                        mime="application/json"
-                    )
+                        # Download button
+                        st.download_button(
+                            label="Download Project Configuration",
+                            data=json_bytes,
+                            file_name="project_configuration.json",
+                            mime="application/json"
+                        )
+
+            _task_builder_fragment(project_name, project_description)
 
 else:
     st.info("Please upload a project ZIP to begin.")
\ No newline at end of file
@@ -3,21 +3,27 @@ import tempfile
 import os
 import zipfile
 import json
+import shutil
+import io
 from pathlib import Path
 import sys
+from PIL import Image
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 # --- Setup paths ---
 project_root = Path(__file__).resolve().parents[2]
 validator_dir = project_root / "validator"
 projects_dir = project_root / "projects"
-sys.path.insert(0, str(validator_dir))
+# Only once per process; reruns reuse the already-imported task_validator module
+if str(validator_dir) not in sys.path:
+    sys.path.insert(0, str(validator_dir))
 
 try:
-    if 'task_validator' in sys.modules:
-        del sys.modules['task_validator']
-    
     from task_validator import TaskValidator
-    
 except ImportError as e:
     st.error(f"TaskValidator import failed: {e}")
     st.error("Please ensure the validator module is properly configured.")
@@ -25,6 +31,187 @@ except ImportError as e:
 
 st.set_page_config(page_title="Student Portal", layout="wide")
 
+
+# One validator per project configuration, reused across reruns and sessions; keyed on the
+# file's mtime so a re-saved project gets a fresh instance
+@st.cache_resource(max_entries=16)
+def _get_validator(config_path, mtime_ns):
+    validator = TaskValidator()
+    validator.load_project_config(config_path)
+    return validator
+
+
+# Project configuration files and their dropdown names, rescanned when the directory changes,
+# at most every 30 seconds otherwise, or when Refresh is clicked
+@st.cache_data(ttl=30, show_spinner=False)
+def _discover_projects(projects_dir_str, dir_mtime_ns):
+    paths = sorted(Path(projects_dir_str).glob("*_configuration.json"))
+    names = [p.stem.replace("_configuration", "").replace("_", " ").title() for p in paths]
+    return names, [str(p) for p in paths]
+
+
+def _loads(data):
+    # Parses JSON bytes; orjson when installed, stdlib json otherwise
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+# Parsed project configuration, re-read only when the file's mtime changes
+@st.cache_data(max_entries=16, show_spinner=False)
+def _load_project(config_path, mtime_ns):
+    return _loads(Path(config_path).read_bytes())
+
+
+# Newest validation JSON in a task's log directory; cached until a new log lands in it
+@st.cache_data(max_entries=256, show_spinner=False)
+def _latest_result_path(task_logs_dir, mtime_ns):
+    with os.scandir(task_logs_dir) as it:
+        entries = [e for e in it if e.name.endswith(".json") and e.is_file()]
+    return max(entries, key=lambda e: e.stat().st_mtime_ns).path if entries else None
+
+
+def _latest_result(task_logs_dir):
+    try:
+        mtime_ns = os.stat(task_logs_dir).st_mtime_ns
+    except OSError:
+        return None
+    return _latest_result_path(task_logs_dir, mtime_ns)
+
+
+# Parsed validation result JSON, re-read only when the log file changes; an unreadable file
+# is cached as None too, so it isn't re-parsed on every rerun
+@st.cache_data(max_entries=128, show_spinner=False)
+def _load_result(path, mtime_ns):
+    try:
+        return _loads(Path(path).read_bytes())
+    except (OSError, ValueError):
+        return None
+
+
+def _latest_result_data(task_logs_dir):
+    # (newest log path or None, its parsed result or None when it can't be read)
+    latest_result = _latest_result(task_logs_dir)
+    if latest_result is None:
+        return None, None
+    try:
+        mtime_ns = os.stat(latest_result).st_mtime_ns
+    except OSError:
+        return latest_result, None
+    return latest_result, _load_result(latest_result, mtime_ns)
+
+
+def _unique_screenshots(screenshots):
+    # One screenshot per capture point, preferring final over initial shots, in one pass
+    best = {}
+    for shot in screenshots:
+        name = os.path.basename(shot)
+        if name.endswith("final.png"):
+            base, rank = name[:-9], 0
+        elif name.endswith("initial.png"):
+            base, rank = name[:-11], 1
+        else:
+            base, rank = name, 2
+        prev = best.get(base)
+        if prev is None or rank < prev[0]:
+            best[base] = (rank, shot)
+    return [shot for _, shot in best.values()]
+
+
+# Screenshot bytes for st.image and the download button, re-read only when the file changes
+@st.cache_data(max_entries=64, show_spinner=False)
+def _read_screenshot(path, mtime_ns):
+    with open(path, "rb") as f:
+        return f.read()
+
+
+# Display copy of a screenshot, downscaled and re-encoded as WEBP once per file revision;
+# the download button still serves the original PNG. Images PIL can't decode (broken files,
+# decompression-bomb sizes) are cached as None so they aren't retried on every rerun
+@st.cache_data(max_entries=64, show_spinner=False)
+def _screenshot_preview(path, mtime_ns, max_width=1024):
+    try:
+        with Image.open(path) as im:
+            im.thumbnail((max_width, max_width * 4))
+            buf = io.BytesIO()
+            im.save(buf, "WEBP", quality=80)
+    except (OSError, SyntaxError, Image.DecompressionBombError):
+        return None
+    return buf.getvalue()
+
+
+def _ui_test_outcome(result_data, task):
+    # ("success" | "error" | None, message) for a result's UI test, shared by every result view
+    playwright_val = result_data.get("playwright_validation", {})
+    if playwright_val.get("success"):
+        return "success", f"{task.get('name', 'Task ' + str(task.get('id', '?')))} passed"
+    if playwright_val.get("message"):
+        return "error", f"Task failed: {playwright_val['message'].replace('UI test failed: ', '')}"
+    return None, "Task validation had issues"
+
+
+def _show_ui_test_outcome(result_data, task):
+    status, message = _ui_test_outcome(result_data, task)
+    if status == "success":
+        st.success(message)
+    elif status == "error":
+        st.error(message)
+    else:
+        st.warning(message)
+
+
+def _validate_upload(task_validator, task_id, upload, student_id, project_id, label):
+    # Streams an uploaded ZIP to a temp file, validates it and records progress; True on success
+    if not zipfile.is_zipfile(upload):
+        # Only reads the end-of-central-directory record; rejects bad uploads before the validator runs
+        st.error("The uploaded file is not a valid ZIP archive.")
+        return False
+    upload.seek(0)
+    with tempfile.NamedTemporaryFile(suffix=".zip", delete=False) as f:
+        shutil.copyfileobj(upload, f, 1 << 20)
+        tmp = f.name
+    try:
+        result = task_validator.validate_task(task_id, tmp, student_id)
+    finally:
+        os.unlink(tmp)
+    if not result.get("success"):
+        error_msg = result.get('message') or result.get('error') or 'Unknown error'
+        st.error(f"{label} failed: {error_msg}")
+        return False
+    # Shown after the caller's rerun, which refreshes the progress metrics
+    st.session_state.validation_notice = f"{label} completed! Score: {result['total_score']} / {result['max_score']}"
+    task_validator.update_student_progress(student_id, result, project_id)
+    st.session_state.pop("progress_key", None)
+    return True
+
+
+# Requirement lines for one task's validation rules, built once per project revision
+@st.cache_data(max_entries=256, show_spinner=False)
+def _requirement_lines(config_path, mtime_ns, task_id):
+    tasks = _load_project(config_path, mtime_ns).get("tasks", [])
+    rules = next((t for t in tasks if t["id"] == task_id), {}).get("validation_rules", {})
+    if isinstance(rules, list):
+        rules = {}
+    lines = []
+    if rules.get("mustHaveElements"):
+        lines.append(f"Elements: {', '.join(rules['mustHaveElements'])}")
+    classes = rules.get("mustHaveClasses")
+    if isinstance(classes, list) and classes:
+        # Handle both string and dict formats
+        class_strings = []
+        for cls in classes:
+            if isinstance(cls, dict):
+                class_strings.append(f"{cls.get('element', '')}.{cls.get('class', '')}")
+            else:
+                class_strings.append(str(cls))
+        lines.append(f"Classes: {', '.join(class_strings)}")
+    if rules.get("mustHaveInputs"):
+        lines.append(f"Inputs: {', '.join(rules['mustHaveInputs'])}")
+    if rules.get("mustHaveContent"):
+        lines.append(f"Content: {', '.join(rules['mustHaveContent'])}")
+    return tuple(lines)
+
+
 # --- Header ---
 st.title("Student Task Validator")
 
@@ -32,74 +219,80 @@ st.title("Student Task Validator")
 col_title, col_refresh, col_clear = st.columns([0.6, 0.2, 0.2])
 with col_refresh:
     if st.button("Refresh", help="Refresh available projects"):
+        _discover_projects.clear()
+        st.session_state.pop("progress_key", None)
         st.rerun()
 with col_clear:
     if st.button("Clear Cache", help="Clear student progress cache"):
-        # Clear all student progress files
-        logs_dir = Path("Logs")
-        if logs_dir.exists():
-            for student_dir in logs_dir.iterdir():
-                if student_dir.is_dir() and student_dir.name.startswith(("student_", "test_")):
-                    progress_file = student_dir / "progress.json"
-                    if progress_file.exists():
-                        progress_file.unlink()
-                        st.success(f"Cleared cache for {student_dir.name}")
+        # Clear all student progress files in one directory pass, reported as a single message
+        cleared = 0
+        try:
+            with os.scandir("Logs") as it:
+                for entry in it:
+                    if entry.name.startswith(("student_", "test_")) and entry.is_dir():
+                        try:
+                            os.unlink(os.path.join(entry.path, "progress.json"))
+                            cleared += 1
+                        except FileNotFoundError:
+                            pass
+        except FileNotFoundError:
+            pass
+        else:
+            st.success(f"Cleared cache for {cleared} student(s)")
+            st.session_state.pop("progress_key", None)
             st.rerun()
 
 # --- Load available project JSON files ---
-project_files = list(projects_dir.glob("*_configuration.json"))
+try:
+    projects_mtime = projects_dir.stat().st_mtime_ns
+except OSError:
+    projects_mtime = 0
+project_names, project_files = _discover_projects(str(projects_dir), projects_mtime)
 
 if not project_files:
     st.warning("No projects found. Please contact your instructor.")
     st.info("Instructors can create projects using the Creator Portal.")
     if st.button("Refresh Projects"):
+        _discover_projects.clear()
         st.rerun()
     st.stop()
 
-# Create mapping for dropdown
-project_names = [p.stem.replace("_configuration", "").replace("_", " ").title() for p in project_files]
-project_map = dict(zip(project_names, project_files))
-
 # --- Project selection ---
 selected_project_name = st.selectbox("Select Project", project_names)
-selected_project_path = project_map[selected_project_name]
+selected_project_path = Path(project_files[project_names.index(selected_project_name)])
 
-with open(selected_project_path, "r", encoding="utf-8") as f:
-    project_data = json.load(f)
+project_mtime = selected_project_path.stat().st_mtime_ns
+project_data = _load_project(str(selected_project_path), project_mtime)
 
-st.subheader(f"{project_data.get('project', 'Unnamed Project')}")
+# Project metadata bound once; project_id keys the student's progress and logs
+project_title = project_data.get("project")
+project_id = (project_title or "unknown").replace(" ", "_").lower()
+all_tasks = project_data.get("tasks", [])
+
+st.subheader(project_title or "Unnamed Project")
 st.caption(project_data.get("description", ""))
 
 # --- Student ID ---
 student_id = st.text_input("Enter Student ID:", value="student_001", help="Enter your unique student identifier")
+# Built once per rerun; each task's log directory is a single join off it
+student_logs_dir = os.path.join("Logs", student_id)
 
-# --- Initialize validator ---
-task_validator = TaskValidator()
-
-# Ensure the validator uses the selected project's configuration JSON
-try:
-    task_validator.load_project_config(str(selected_project_path))
-except Exception as e:
-    st.error(f"Failed to load project configuration: {e}")
+# --- Initialize validator with the selected project's configuration JSON ---
+task_validator = _get_validator(str(selected_project_path), project_mtime)
 
-# --- Load tasks from selected project ---
-all_tasks = project_data.get("tasks", [])
+# --- Tasks from selected project ---
 if not all_tasks:
     st.warning("No tasks defined in this project.")
     st.stop()
+tasks_by_id = {t["id"]: t for t in all_tasks}
 
 # --- Load student progress for this specific project ---
-project_id = project_data.get("project", "unknown").replace(" ", "_").lower()
-
-# Debug: Check method signature
-import inspect
-try:
-    sig = inspect.signature(task_validator.get_student_progress)
-    st.write(f"Method signature: {sig}")
-except Exception as e:
-    st.write(f"Error getting signature: {e}")
-
-progress = task_validator.get_student_progress(student_id, project_id)
+# Progress is read from disk once per student/project and dropped whenever a validation updates it
+progress_key = (student_id, project_id)
+if st.session_state.get("progress_key") != progress_key:
+    st.session_state.progress = task_validator.get_student_progress(student_id, project_id)
+    st.session_state.progress_key = progress_key
+progress = st.session_state.progress
 
 st.markdown("### Your Progress")
 col1, col2, col3, col4 = st.columns(4)
@@ -112,22 +305,28 @@ with col3:
 with col4:
     st.metric("Last Updated", progress["last_updated"][:10])
 
+# Result of the validation that triggered this rerun
+validation_notice = st.session_state.pop("validation_notice", None)
+if validation_notice:
+    st.success(validation_notice)
+
 st.divider()
 
 # --- Determine current unlocked task ---
+completed = frozenset(progress["completed_tasks"])
 current_task = None
 for task in all_tasks:
     task_id = task["id"]
     required_tasks = task.get("unlock_condition", {}).get("required_tasks", [])
-    is_unlocked = all(rt in progress["completed_tasks"] for rt in required_tasks)
-    if is_unlocked and task_id not in progress["completed_tasks"]:
+    is_unlocked = completed.issuperset(required_tasks)
+    if is_unlocked and task_id not in completed:
         current_task = task
         break
 
 if not current_task:
     if progress["completed_tasks"]:
         last_completed = progress["completed_tasks"][-1]
-        current_task = next((t for t in all_tasks if t["id"] == last_completed), all_tasks[0])
+        current_task = tasks_by_id.get(last_completed, all_tasks[0])
     else:
         current_task = all_tasks[0]
 
@@ -145,7 +344,7 @@ if current_task and not all_tasks_completed:
 
     with col_left:
         # Check if current task is completed
-        is_current_completed = current_task["id"] in progress["completed_tasks"]
+        is_current_completed = current_task["id"] in completed
         status_icon = "Completed" if is_current_completed else "In Progress"
         
         st.markdown(f"### {status_icon} Task {current_task['id']}: {current_task['name']}")
@@ -155,321 +354,210 @@ if current_task and not all_tasks_completed:
         if is_current_completed:
             st.success("This task has been completed!")
             # Show last validation results
-            task_logs_dir = Path("Logs") / student_id / f"task_{current_task['id']}"
-            if task_logs_dir.exists():
-                json_files = list(task_logs_dir.glob("*.json"))
-                if json_files:
-                    latest_result = json_files[-1]
-                    try:
-                        with open(latest_result, 'r', encoding='utf-8') as f:
-                            result_data = json.load(f)
-                        st.write(f"**Last Score:** {result_data.get('total_score', 0)} / {result_data.get('max_score', 0)}")
-                        
-                        # Show validation breakdown
-                        static_val = result_data.get('static_validation', {})
-                        playwright_val = result_data.get('playwright_validation', {})
-                        
-                        col_static, col_playwright = st.columns(2)
-                        with col_static:
-                            if static_val.get('success'):
-                                st.success("Static validation passed")
-                            else:
-                                st.error("Static validation failed")
-                        
-                        with col_playwright:
-                            if playwright_val.get('success'):
-                                task_name = current_task.get('name', f'Task {current_task.get("id", "?")}')
-                                st.success(f"{task_name} passed")
-                            elif playwright_val.get('message'):
-                                # Extract the actual error from the message
-                                error_msg = playwright_val['message']
-                                if "UI test failed:" in error_msg:
-                                    error_msg = error_msg.replace("UI test failed: ", "")
-                                st.error(f"Task failed: {error_msg}")
-                            else:
-                                st.warning("Task validation had issues")
-                    except:
-                        st.write("Task completed (details unavailable)")
+            latest_result, result_data = _latest_result_data(os.path.join(student_logs_dir, f"task_{current_task['id']}"))
+            if result_data:
+                st.write(f"**Last Score:** {result_data.get('total_score', 0)} / {result_data.get('max_score', 0)}")
+                
+                # Show validation breakdown
+                static_val = result_data.get('static_validation', {})
+                
+                col_static, col_playwright = st.columns(2)
+                with col_static:
+                    if static_val.get('success'):
+                        st.success("Static validation passed")
+                    else:
+                        st.error("Static validation failed")
+                
+                with col_playwright:
+                    _show_ui_test_outcome(result_data, current_task)
+            elif latest_result:
+                st.write("Task completed (details unavailable)")
         else:
             st.info("Complete this task to unlock the next one")
 
-        st.markdown("**Requirements:**")
+        requirement_lines = _requirement_lines(str(selected_project_path), project_mtime, current_task["id"])
+        st.markdown("\n".join(["**Requirements:**", *(f"- {line}" for line in requirement_lines)]))
+
         validation = current_task.get("validation_rules", {})
-        
         if isinstance(validation, list):
             validation = {}
-        
-        must_have_elements = validation.get("mustHaveElements", [])
-        must_have_classes = validation.get("mustHaveClasses", [])
-        must_have_inputs = validation.get("mustHaveInputs", [])
-        must_have_content = validation.get("mustHaveContent", [])
-
-        if must_have_elements:
-            st.write(f"- Elements: {', '.join(must_have_elements)}")
-        if must_have_classes:
-            class_strings = []
-            for cls in must_have_classes:
-                if isinstance(cls, dict):
-                    class_strings.append(f"{cls.get('element', '')}.{cls.get('class', '')}")
-                else:
-                    class_strings.append(str(cls))
-            st.write(f"- Classes: {', '.join(class_strings)}")
-        if must_have_inputs:
-            st.write(f"- Inputs: {', '.join(must_have_inputs)}")
-        if must_have_content:
-            st.write(f"- Content: {', '.join(must_have_content)}")
 
         st.info(f"Total Points: {validation.get('points', 0)}")
 
     with col_right:
-        st.markdown("**Upload your project ZIP file**")
-        uploaded_file = st.file_uploader("Upload ZIP", type=["zip"], key=f"upload_task_{current_task['id']}")
-
-        if uploaded_file:
-            st.success("File ready for validation.")
-
-        col_a, col_b, col_c = st.columns([1, 1, 1])
-        with col_a:
-            if st.button("Validate", key=f"validate_{current_task['id']}", help="Validate your current upload"):
-                if not uploaded_file:
-                    st.warning("Please upload a ZIP first.")
-                else:
-                    with st.spinner("Validating your submission..."):
-                        tmp = tempfile.mktemp(suffix=".zip")
-                        with open(tmp, "wb") as f:
-                            f.write(uploaded_file.getvalue())
-                        
-                        try:
-                            task_validator.load_project_config(str(selected_project_path))
-                        except Exception:
-                            pass
-                        
-                        result = task_validator.validate_task(current_task["id"], tmp, student_id)
-                        if result.get("success"):
-                            st.success(f"Validation completed! Score: {result['total_score']} / {result['max_score']}")
-                            task_validator.update_student_progress(student_id, result, project_id)
-                            st.rerun()
-                        else:
-                            error_msg = result.get('message') or result.get('error') or 'Unknown error'
-                            st.error(f"Validation failed: {error_msg}")
-
-        with col_b:
-            if st.button("Submit", key=f"submit_{current_task['id']}", help="Submit your current upload"):
-                if not uploaded_file:
-                    st.warning("Please upload a ZIP first.")
-                else:
-                    st.success("Task submitted successfully!")
-
-        with col_c:
-            if st.button("Re-upload", key=f"reupload_{current_task['id']}", help="Upload a new ZIP file"):
+        # Choosing a file doesn't rerun the page; the upload and buttons dispatch together on submit
+        with st.form(f"upload_form_{current_task['id']}", clear_on_submit=False, border=False):
+            st.markdown("**Upload your project ZIP file**")
+            uploaded_file = st.file_uploader("Upload ZIP", type=["zip"], key=f"upload_task_{current_task['id']}")
+
+            col_a, col_b, col_c = st.columns([1, 1, 1])
+            with col_a:
+                do_validate = st.form_submit_button("Validate", key=f"validate_{current_task['id']}", help="Validate your current upload")
+            with col_b:
+                do_submit = st.form_submit_button("Submit", key=f"submit_{current_task['id']}", help="Submit your current upload")
+            with col_c:
+                # Submitting the form already reruns, which resets the page for a new upload
+                st.form_submit_button("Re-upload", key=f"reupload_{current_task['id']}", help="Upload a new ZIP file")
+
+        if (do_validate or do_submit) and not uploaded_file:
+            st.warning("Please upload a ZIP first.")
+        elif do_validate:
+            with st.spinner("Validating your submission..."):
+                validated = _validate_upload(task_validator, current_task["id"], uploaded_file, student_id, project_id, "Validation")
+            if validated:
                 st.rerun()
+        elif do_submit:
+            st.success("Task submitted successfully!")
 
 st.divider()
 st.subheader("All Tasks")
 
-for t in all_tasks:
-    if t == current_task:
-        continue
-    
-    is_completed = t["id"] in progress["completed_tasks"]
+# Each task in the list runs as its own fragment, so a task's buttons and retry upload only
+# rerun that task (st.fragment needs Streamlit >= 1.37)
+@st.fragment
+def _task_fragment(t, completed):
+    is_completed = t["id"] in completed
     task_status = "Completed" if is_completed else "Pending"
-    
-    with st.expander(f"Task {t['id']}: {t['name']} - {task_status}"):
+
+    # Collapsed tasks skip reading their results and building the detail widgets entirely
+    if not st.toggle(f"Task {t['id']}: {t['name']} - {task_status}", key=f"task_details_{t['id']}"):
+        return
+
+    # Latest validation result, read once and shared by the sections below;
+    # result_data stays None when the log can't be read, which they report as unavailable
+    latest_result = result_data = None
+    if is_completed:
+        latest_result, result_data = _latest_result_data(os.path.join(student_logs_dir, f"task_{t['id']}"))
+
+    with st.container(border=True):
         col_status, col_verify = st.columns([0.7, 0.3])
-        
+    
         with col_status:
-            st.write(f"**Description:** {t['description']}")
             validation_rules = t.get('validation_rules', {})
             if isinstance(validation_rules, list):
                 validation_rules = {}
-            st.write(f"**Points:** {validation_rules.get('points', 0)}")
-            
+            st.markdown(f"**Description:** {t['description']}\n\n**Points:** {validation_rules.get('points', 0)}")
+        
             if is_completed:
                 st.success("Task completed successfully!")
-                task_logs_dir = Path("Logs") / student_id / f"task_{t['id']}"
-                if task_logs_dir.exists():
-                    json_files = list(task_logs_dir.glob("*.json"))
-                    if json_files:
-                        latest_result = json_files[-1]  # Get most recent result
-                        try:
-                            with open(latest_result, 'r', encoding='utf-8') as f:
-                                result_data = json.load(f)
-                            st.write(f"**Last Score:** {result_data.get('total_score', 0)} / {result_data.get('max_score', 0)}")
-                            
-                            static_val = result_data.get('static_validation', {})
-                            playwright_val = result_data.get('playwright_validation', {})
-                            
-                            if static_val.get('success'):
-                                st.write("Static validation passed")
-                            if playwright_val.get('success'):
-                                task_name = t.get('name', f'Task {t.get("id", "?")}')
-                                st.write(f"{task_name} passed")
-                            elif playwright_val.get('message'):
-                                error_msg = playwright_val['message']
-                                if "UI test failed:" in error_msg:
-                                    error_msg = error_msg.replace("UI test failed: ", "")
-                                st.write(f"Task failed: {error_msg}")
-                        except Exception as e:
-                            st.write("Validation completed (details unavailable)")
-        
+                if result_data:
+                    # Result summary emitted as one markdown element
+                    summary = [f"**Last Score:** {result_data.get('total_score', 0)} / {result_data.get('max_score', 0)}"]
+                
+                    if result_data.get('static_validation', {}).get('success'):
+                        summary.append("Static validation passed")
+                    status, message = _ui_test_outcome(result_data, t)
+                    if status:
+                        summary.append(message)
+                    st.markdown("\n\n".join(summary))
+                elif latest_result:
+                    st.write("Validation completed (details unavailable)")
+    
         with col_verify:
             if is_completed:
                 st.markdown("### Verification Status")
                 st.success("Verified")
-                
+            
                 # Add re-upload option for completed tasks
                 st.markdown("### Re-attempt Task")
                 if st.button("Re-upload & Validate", key=f"retry_{t['id']}", help="Upload a new version and validate again"):
                     st.info("Please upload your updated project ZIP file below.")
                     st.session_state[f"retry_task_{t['id']}"] = True
-                
-                task_logs_dir = Path("Logs") / student_id / f"task_{t['id']}"
-                if task_logs_dir.exists():
-                    json_files = list(task_logs_dir.glob("*.json"))
-                    if json_files:
-                        latest_result = json_files[-1]
-                        try:
-                            with open(latest_result, 'r', encoding='utf-8') as f:
-                                result_data = json.load(f)
-                            
-                            screenshots = result_data.get('screenshots', [])
-                            if screenshots:
-                                st.write("Screenshots captured:")
-                                for i, screenshot in enumerate(screenshots[:3]):
-                                    screenshot_path = Path(screenshot).resolve()
-                                    if screenshot_path.exists():
-                                        try:
-                                            screenshot_name = f"Screenshot {i+1}"
-                                            
-                                            st.markdown(f"**{screenshot_name}**")
-                                            
-                                            with open(screenshot_path, "rb") as img_file:
-                                                img_data = img_file.read()
-                                            
-                                            st.image(img_data, caption=f"Click to view full size", width='stretch')
-                                            
-                                            st.download_button(
-                                                label="📥 Download Image",
-                                                data=img_data,
-                                                file_name=screenshot_path.name,
-                                                mime="image/png",
-                                                key=f"download_{i}"
-                                            )
-                                            st.caption(f"File: {screenshot_path.name}")
-                                        except Exception as e:
-                                            st.write(f"Could not display screenshot {i+1}: {str(e)}")
+            
+                if result_data:
+                    screenshots = _unique_screenshots(result_data.get('screenshots', []))
+                    if screenshots:
+                        st.write("Screenshots captured:")
+                        for i, screenshot in enumerate(screenshots[:3]):
+                            screenshot_path = Path(screenshot).resolve()
+                            if screenshot_path.exists():
+                                try:
+                                    screenshot_name = f"Screenshot {i+1}"
+                                
+                                    st.markdown(f"**{screenshot_name}**")
+                                
+                                    screenshot_mtime = screenshot_path.stat().st_mtime_ns
+                                    img_data = _read_screenshot(str(screenshot_path), screenshot_mtime)
+                                
+                                    preview = _screenshot_preview(str(screenshot_path), screenshot_mtime)
+                                    if preview is not None:
+                                        st.image(preview, caption=f"Click to view full size", width='stretch')
                                     else:
-                                        st.write(f"Screenshot {i+1} not found: {screenshot_path}")
-                            
-                            # Show validation timestamp
-                            timestamp = result_data.get('timestamp', '')
-                            if timestamp:
-                                st.caption(f"Verified: {timestamp[:19]}")
+                                        st.write(f"Could not display screenshot {i+1}; the original is available below.")
                                 
-                        except Exception as e:
-                            st.write("Verification completed")
+                                    st.download_button(
+                                        label="📥 Download Image",
+                                        data=img_data,
+                                        file_name=screenshot_path.name,
+                                        mime="image/png",
+                                        key=f"download_{t['id']}_{i}"
+                                    )
+                                    st.caption(f"File: {screenshot_path.name}")
+                                except OSError as e:
+                                    st.write(f"Could not display screenshot {i+1}: {str(e)}")
+                            else:
+                                st.write(f"Screenshot {i+1} not found: {screenshot_path}")
+                
+                    # Show validation timestamp
+                    timestamp = result_data.get('timestamp', '')
+                    if timestamp:
+                        st.caption(f"Verified: {timestamp[:19]}")
+                elif latest_result:
+                    st.write("Verification completed")
             else:
                 st.markdown("### Verification Status")
                 st.info("Not verified")
                 st.caption("Complete the task to see verification details")
 
-        st.write("**Required Files:**")
-        for rf in t.get("required_files", []):
-            st.write(f"- {rf}")
+        # One markdown element per section instead of one per line
+        st.markdown("\n".join(["**Required Files:**", *(f"- {rf}" for rf in t.get("required_files", []))]))
 
         rules = t.get("validation_rules", {})
         if isinstance(rules, list):
             rules = {}
         if rules:
-            st.write("**Validation Rules:**")
-            if "mustHaveElements" in rules:
-                st.write(f"Elements: {', '.join(rules['mustHaveElements'])}")
-            if "mustHaveClasses" in rules:
-                classes = rules['mustHaveClasses']
-                if isinstance(classes, list) and classes:
-                    # Handle both string and dict formats
-                    class_strings = []
-                    for cls in classes:
-                        if isinstance(cls, dict):
-                            class_strings.append(f"{cls.get('element', '')}.{cls.get('class', '')}")
-                        else:
-                            class_strings.append(str(cls))
-                    st.write(f"Classes: {', '.join(class_strings)}")
-            if "mustHaveInputs" in rules:
-                st.write(f"Inputs: {', '.join(rules['mustHaveInputs'])}")
-            if "mustHaveContent" in rules:
-                st.write(f"Content: {', '.join(rules['mustHaveContent'])}")
+            rule_lines = _requirement_lines(str(selected_project_path), project_mtime, t["id"])
+            st.markdown("\n\n".join(["**Validation Rules:**", *rule_lines]))
 
         pt = t.get("playwright_test", {})
         if pt:
-            st.write("**UI Test:**")
-            st.write(f"- Route: {pt.get('route', '/')}")
-            st.write(f"- Points: {pt.get('points', 0)}")
-            
+            st.markdown(f"**UI Test:**\n- Route: {pt.get('route', '/')}\n- Points: {pt.get('points', 0)}")
+        
             # Show UI test validation status
-            if is_completed:
-                task_logs_dir = Path("Logs") / student_id / f"task_{t['id']}"
-                if task_logs_dir.exists():
-                    json_files = list(task_logs_dir.glob("*.json"))
-                    if json_files:
-                        latest_result = json_files[-1]
-                        try:
-                            with open(latest_result, 'r', encoding='utf-8') as f:
-                                result_data = json.load(f)
-                            playwright_val = result_data.get('playwright_validation', {})
-                            
-                            if playwright_val.get('success'):
-                                task_name = t.get('name', f'Task {t.get("id", "?")}')
-                                st.success(f"{task_name} passed")
-                            elif playwright_val.get('message'):
-                                # Extract the actual error from the message
-                                error_msg = playwright_val['message']
-                                if "UI test failed:" in error_msg:
-                                    error_msg = error_msg.replace("UI test failed: ", "")
-                                st.error(f"Task failed: {error_msg}")
-                            else:
-                                st.warning("Task validation had issues")
-                        except:
-                            pass
+            if result_data:
+                _show_ui_test_outcome(result_data, t)
 
         # Re-upload section for completed tasks
         if is_completed and st.session_state.get(f"retry_task_{t['id']}", False):
             st.markdown("---")
             st.markdown("### Re-attempt This Task")
+        
+            with st.form(f"retry_form_{t['id']}", clear_on_submit=False, border=False):
+                retry_upload = st.file_uploader(
+                    f"Upload updated ZIP for Task {t['id']}", 
+                    type=["zip"], 
+                    key=f"retry_upload_{t['id']}"
+                )
             
-            retry_upload = st.file_uploader(
-                f"Upload updated ZIP for Task {t['id']}", 
-                type=["zip"], 
-                key=f"retry_upload_{t['id']}"
-            )
-            
-            if retry_upload:
-                st.success("Updated file ready for validation.")
-                
                 col_retry_a, col_retry_b = st.columns(2)
                 with col_retry_a:
-                    if st.button("Validate Update", key=f"validate_retry_{t['id']}"):
-                        with st.spinner("Validating your updated submission..."):
-                            tmp = tempfile.mktemp(suffix=".zip")
-                            with open(tmp, "wb") as f:
-                                f.write(retry_upload.getvalue())
-                            
-                            try:
-                                task_validator.load_project_config(str(selected_project_path))
-                            except Exception:
-                                pass
-                            
-                            result = task_validator.validate_task(t["id"], tmp, student_id)
-                            if result.get("success"):
-                                st.success(f"Updated validation completed! Score: {result['total_score']} / {result['max_score']}")
-                                task_validator.update_student_progress(student_id, result, project_id)
-                                st.session_state[f"retry_task_{t['id']}"] = False
-                                st.rerun()
-                            else:
-                                error_msg = result.get('message') or result.get('error') or 'Unknown error'
-                                st.error(f"Updated validation failed: {error_msg}")
-                
+                    do_validate = st.form_submit_button("Validate Update", key=f"validate_retry_{t['id']}")
                 with col_retry_b:
-                    if st.button("Cancel", key=f"cancel_retry_{t['id']}"):
-                        st.session_state[f"retry_task_{t['id']}"] = False
-                        st.rerun()
+                    do_cancel = st.form_submit_button("Cancel", key=f"cancel_retry_{t['id']}")
+
+            if do_cancel:
+                st.session_state[f"retry_task_{t['id']}"] = False
+                st.rerun()
+            elif do_validate and not retry_upload:
+                st.warning("Please upload a ZIP first.")
+            elif do_validate:
+                with st.spinner("Validating your updated submission..."):
+                    validated = _validate_upload(task_validator, t["id"], retry_upload, student_id, project_id, "Updated validation")
+                if validated:
+                    st.session_state[f"retry_task_{t['id']}"] = False
+                    st.rerun()
+
+
+for t in all_tasks:
+    if t != current_task:
+        _task_fragment(t, completed)